@@ -105,8 +105,10 @@ def compute_percentiles_for_metric(values: pd.Series,
         'std': clean_values.std()
     }
 
-    for p in percentiles:
-        result[f'p{p}'] = np.percentile(clean_values, p)
+    # One partition pass for all breakpoints instead of one per percentile
+    breakpoints = np.percentile(clean_values, percentiles)
+    for p, value in zip(percentiles, breakpoints):
+        result[f'p{p}'] = value
 
     return result
 
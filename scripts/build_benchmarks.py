@@ -25,6 +25,7 @@ from pathlib import Path
 from datetime import datetime
 
 from data_loader import load_team_box, load_player_box
+from metrics import add_team_rates, apply_dtype_policy, estimate_possessions_box
 
 # ============================================================================
 # CONFIGURATION
@@ -68,8 +69,20 @@ PLAYER_METRICS = [
     'tov_pct',
 ]
 
+# Team box columns used to build benchmarks (the rest of the file is never decoded)
+TEAM_BOX_COLUMNS = [
+    'game_id', 'team_id', 'game_date',
+    'field_goals_made', 'field_goals_attempted',
+    'three_point_field_goals_made', 'three_point_field_goals_attempted',
+    'free_throws_made', 'free_throws_attempted',
+    'offensive_rebounds', 'defensive_rebounds',
+    'assists', 'turnovers', 'total_turnovers',
+    'team_score', 'points', 'opponent_team_score'
+]
+
 # Percentile breakpoints
 PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+PERCENTILE_FRACS = np.array(PERCENTILES) / 100.0
 
 
 
@@ -78,13 +91,11 @@ PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
 # METRIC CALCULATIONS
 # ============================================================================
 
-def calculate_possessions(row):
-    """Dean Oliver possession estimate."""
-    fga = float(row.get('field_goals_attempted', 0) or 0)
-    fta = float(row.get('free_throws_attempted', 0) or 0)
-    orb = float(row.get('offensive_rebounds', 0) or 0)
-    tov = float(row.get('turnovers', 0) or row.get('total_turnovers', 0) or 0)
-    return max(fga + 0.44 * fta - orb + tov, 1)
+# Team rates written by add_team_metrics (NaN where the denominator is 0)
+BENCHMARK_RATE_COLUMNS = [
+    'efg_pct', 'tov_pct', 'ftr', 'ts_pct', 'fg2_pct', 'fg3_pct',
+    'ft_pct', 'fg3_rate', 'ast_pct', 'ast_tov', 'ortg'
+]
 
 
 def add_team_metrics(df):
@@ -100,9 +111,7 @@ def add_team_metrics(df):
         'assists', 'turnovers', 'total_turnovers',
         'team_score', 'opponent_team_score'
     ]
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    apply_dtype_policy(df, counts=numeric_cols)
     
     # Shortcuts
     df['pts'] = df.get('team_score', df.get('points', 0))
@@ -121,37 +130,22 @@ def add_team_metrics(df):
     df['ast'] = df['assists']
     
     # Possessions
-    df['poss_est'] = df.apply(calculate_possessions, axis=1)
+    df['poss_est'] = estimate_possessions_box(df)
     
     # === Calculate metrics ===
     
-    # Four Factors
-    df['efg_pct'] = np.where(df['fga'] > 0, (df['fgm'] + 0.5 * df['fg3m']) / df['fga'], np.nan)
-    df['tov_pct'] = np.where(df['poss_est'] > 0, df['tov'] / df['poss_est'], np.nan)
-    df['ftr'] = np.where(df['fga'] > 0, df['fta'] / df['fga'], np.nan)
-    
-    # OREB% requires opponent DRB - we'll compute game-level later
-    # For now, use raw ORB
-    
-    # Shooting
-    df['ts_pct'] = np.where(
-        (df['fga'] + 0.44 * df['fta']) > 0,
-        df['pts'] / (2 * (df['fga'] + 0.44 * df['fta'])),
-        np.nan
-    )
-    df['fg2_pct'] = np.where(df['fg2a'] > 0, df['fg2m'] / df['fg2a'], np.nan)
-    df['fg3_pct'] = np.where(df['fg3a'] > 0, df['fg3m'] / df['fg3a'], np.nan)
-    df['ft_pct'] = np.where(df['fta'] > 0, df['ftm'] / df['fta'], np.nan)
-    df['fg3_rate'] = np.where(df['fga'] > 0, df['fg3a'] / df['fga'], np.nan)
-    
-    # Ball movement
-    df['ast_pct'] = np.where(df['fgm'] > 0, df['ast'] / df['fgm'], np.nan)
-    df['ast_tov'] = np.where(df['tov'] > 0, df['ast'] / df['tov'], np.nan)
+    add_team_rates(df, BENCHMARK_RATE_COLUMNS, fill=np.nan)
+    # A/TO is undefined without turnovers, so it stays out of the benchmarks
+    df['ast_tov'] = df['ast_tov'].where(df['tov'] > 0)
     
-    # Ratings
-    df['ortg'] = np.where(df['poss_est'] > 0, 100 * df['pts'] / df['poss_est'], np.nan)
     df['pace'] = df['poss_est']
     
+    rate_cols = [
+        'poss_est', 'efg_pct', 'tov_pct', 'ftr', 'ts_pct', 'fg2_pct', 'fg3_pct',
+        'ft_pct', 'fg3_rate', 'ast_pct', 'ast_tov', 'ortg', 'pace'
+    ]
+    apply_dtype_policy(df, rates=rate_cols)
+    
     return df
 
 
@@ -164,57 +158,43 @@ def add_rebounding_context(df):
         print("  Cannot compute OREB%/DREB% - missing game_id or team_id")
         return df
     
-    # Create opponent lookup
-    opp_data = df[['game_id', 'team_id', 'orb', 'drb']].copy()
-    opp_data = opp_data.rename(columns={
-        'team_id': 'opponent_team_id',
-        'orb': 'opp_orb',
-        'drb': 'opp_drb'
-    })
-    
-    # For each game, there are 2 teams - need to cross-match
-    # This requires knowing which team is the opponent
-    
-    # Simple approach: group by game, get the "other" team's rebounds
-    game_groups = df.groupby('game_id')
-    
-    result_rows = []
-    for game_id, group in game_groups:
-        if len(group) != 2:
-            # Skip games without exactly 2 teams
-            result_rows.append(group)
-            continue
-        
-        teams = group['team_id'].tolist()
-        
-        for idx, row in group.iterrows():
-            row = row.copy()
-            
-            # Find opponent
-            opp_team = [t for t in teams if t != row['team_id']]
-            if opp_team:
-                opp_row = group[group['team_id'] == opp_team[0]].iloc[0]
-                row['opp_orb'] = opp_row['orb']
-                row['opp_drb'] = opp_row['drb']
-                
-                # Calculate OREB% and DREB%
-                if (row['orb'] + row['opp_drb']) > 0:
-                    row['oreb_pct'] = row['orb'] / (row['orb'] + row['opp_drb'])
-                if (row['drb'] + row['opp_orb']) > 0:
-                    row['dreb_pct'] = row['drb'] / (row['drb'] + row['opp_orb'])
-                
-                # Calculate DRtg and Net Rtg
-                opp_pts = opp_row['pts'] if 'pts' in opp_row else opp_row.get('team_score', 0)
-                opp_poss = opp_row['poss_est']
-                
-                if opp_poss > 0:
-                    row['drtg'] = 100 * opp_pts / opp_poss
-                    row['net_rtg'] = row['ortg'] - row['drtg']
-            
-            result_rows.append(pd.DataFrame([row]))
-    
-    if result_rows:
-        return pd.concat(result_rows, ignore_index=True)
+    df = df.reset_index(drop=True)
+
+    # Pair each row with its opponent by position: sort by game_id, keep games
+    # with exactly 2 rows (and 2 different teams), and point the rows at each other
+    game_ids = df['game_id'].to_numpy()
+    team_ids = df['team_id'].to_numpy()
+    order = np.argsort(game_ids, kind='stable')
+    sorted_ids = game_ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    sizes = np.diff(np.r_[starts, len(order)])
+    first = order[starts[sizes == 2]]
+    second = order[starts[sizes == 2] + 1]
+    distinct = team_ids[first] != team_ids[second]
+    first, second = first[distinct], second[distinct]
+
+    opp_idx = np.full(len(df), -1)
+    opp_idx[first] = second
+    opp_idx[second] = first
+    has_opp = opp_idx >= 0
+
+    def opponent_values(col):
+        values = df[col].to_numpy(dtype=np.float64)
+        return np.where(has_opp, values[opp_idx], np.nan)
+
+    df['opp_orb'] = opponent_values('orb')
+    df['opp_drb'] = opponent_values('drb')
+
+    # OREB% and DREB% (NaN when there is no opponent or no rebounds)
+    oreb_chances = df['orb'] + df['opp_drb']
+    dreb_chances = df['drb'] + df['opp_orb']
+    df['oreb_pct'] = (df['orb'] / oreb_chances).where(oreb_chances > 0).astype('float32')
+    df['dreb_pct'] = (df['drb'] / dreb_chances).where(dreb_chances > 0).astype('float32')
+
+    # DRtg is the opponent's ORtg (100 * opp pts / opp poss); Net Rtg follows
+    df['drtg'] = opponent_values('ortg').astype('float32')
+    df['net_rtg'] = df['ortg'] - df['drtg']
+
     return df
 
 
@@ -228,55 +208,51 @@ def build_benchmarks(df, metrics, label="team"):
     """
     print(f"\n--- Building {label} benchmarks ---")
     
-    rows = []
+    present = [m for m in metrics if m in df.columns]
+    counts = df[present].count()
+    usable = [m for m in present if counts[m] >= 10]
     
+    if usable:
+        # Stats and breakpoints for every usable metric at once (NaNs skipped per column)
+        values = df[usable]
+        stats = values.agg(['mean', 'std', 'min', 'max']).T
+        quantiles = values.quantile(PERCENTILE_FRACS).T
+        quantiles.columns = [f'p{p}' for p in PERCENTILES]
+        
+        result = pd.concat([stats, quantiles], axis=1).rename_axis('metric').reset_index()
+        result.insert(1, 'level', label)
+        result.insert(2, 'n_observations', counts[usable].to_numpy())
+    else:
+        result = pd.DataFrame()
+    
+    summary = result.set_index('metric') if usable else result
     for metric in metrics:
         if metric not in df.columns:
             print(f"  ⊘ {metric} not in data")
-            continue
-        
-        values = df[metric].dropna()
-        
-        if len(values) < 10:
-            print(f"  ⊘ {metric} has insufficient data ({len(values)} values)")
-            continue
-        
-        row = {
-            'metric': metric,
-            'level': label,
-            'n_observations': len(values),
-            'mean': values.mean(),
-            'std': values.std(),
-            'min': values.min(),
-            'max': values.max(),
-        }
-        
-        for p in PERCENTILES:
-            row[f'p{p}'] = np.percentile(values, p)
-        
-        rows.append(row)
-        print(f"  ✓ {metric}: mean={row['mean']:.3f}, p50={row['p50']:.3f}")
+        elif counts[metric] < 10:
+            print(f"  ⊘ {metric} has insufficient data ({counts[metric]} values)")
+        else:
+            print(f"  ✓ {metric}: mean={summary.at[metric, 'mean']:.3f}, p50={summary.at[metric, 'p50']:.3f}")
     
-    return pd.DataFrame(rows)
+    return result
 
 
 def generate_tier_lookup(benchmark_df):
     """
     Generate lookup table for assigning percentile tiers.
     """
-    tiers = []
-    
-    for _, row in benchmark_df.iterrows():
-        tiers.append({
-            'metric': row['metric'],
-            'elite_min': row['p90'],
-            'great_min': row['p75'],
-            'above_avg_min': row['p60'] if 'p60' in row else row['p50'],
-            'avg_min': row['p40'] if 'p40' in row else row['p25'],
-            'below_avg_min': row['p25'],
-        })
-    
-    return pd.DataFrame(tiers)
+    if benchmark_df.empty:
+        return pd.DataFrame()
+    
+    # Column-wise build; p60/p40 fall back to p50/p25 for older benchmark files
+    return pd.DataFrame({
+        'metric': benchmark_df['metric'],
+        'elite_min': benchmark_df['p90'],
+        'great_min': benchmark_df['p75'],
+        'above_avg_min': benchmark_df['p60' if 'p60' in benchmark_df.columns else 'p50'],
+        'avg_min': benchmark_df['p40' if 'p40' in benchmark_df.columns else 'p25'],
+        'below_avg_min': benchmark_df['p25'],
+    }).reset_index(drop=True)
 
 
 # ============================================================================
@@ -298,7 +274,7 @@ def main(season=2024, output_path=None):
     
     # Load data
     print("\n--- Loading Team Box Data ---")
-    team_box = load_team_box(season, DATA_DIR)
+    team_box = load_team_box(season, DATA_DIR, columns=TEAM_BOX_COLUMNS)
     
     if team_box.empty:
         print("ERROR: Could not load team box data")
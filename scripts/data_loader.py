@@ -11,7 +11,16 @@ Data Sources:
 - Local: data/raw/ or data/raw/{season}/ directory
 """
 
+import hashlib
+import io
+import json
+import os
+import shutil
+import urllib.error
+import urllib.request
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from pathlib import Path
 from typing import List, Optional
 
@@ -24,6 +33,9 @@ WEHOOP_BASE = "https://github.com/sportsdataverse/wehoop-wbb-data/releases/downl
 # Default data directory (relative to repo root)
 DEFAULT_DATA_DIR = Path("data")
 
+# Seconds to wait on a remote download before falling back to a cached copy
+FETCH_TIMEOUT = 30
+
 
 def load_rds_file(filepath: Path) -> pd.DataFrame:
     """Load an RDS file (R data format) into a pandas DataFrame."""
@@ -38,11 +50,106 @@ def load_rds_file(filepath: Path) -> pd.DataFrame:
         raise ImportError("pyreadr package required to read RDS files. Install with: pip install pyreadr")
 
 
+def fetch_cached(url: str, cache_dir: Path) -> Path:
+    """
+    Download a remote file into a local cache, reusing the cached copy.
+
+    A cached copy is revalidated with the server (ETag / Last-Modified) and
+    only re-downloaded when it changed. If the server cannot be reached, the
+    cached copy is used as-is.
+
+    Args:
+        url: Remote file URL
+        cache_dir: Directory holding cached downloads and their metadata
+
+    Returns:
+        Path to the local copy of `url`
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    url_key = hashlib.sha1(url.encode()).hexdigest()[:12]
+    path = cache_dir / f"{url_key}_{url.rsplit('/', 1)[-1]}"
+    meta_path = path.with_name(path.name + '.json')
+
+    request = urllib.request.Request(url)
+    if path.exists() and meta_path.exists():
+        meta = json.loads(meta_path.read_text())
+        if meta.get('etag'):
+            request.add_header('If-None-Match', meta['etag'])
+        if meta.get('last_modified'):
+            request.add_header('If-Modified-Since', meta['last_modified'])
+
+    try:
+        with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response:
+            tmp_path = path.with_name(path.name + '.part')
+            with open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(response, f)
+            os.replace(tmp_path, path)
+            meta_path.write_text(json.dumps({
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }))
+    except urllib.error.HTTPError as e:
+        if e.code != 304 and not path.exists():
+            raise
+    except OSError:
+        # Offline, timed out, or host unreachable (URLError is an OSError)
+        if not path.exists():
+            raise
+    return path
+
+
+def read_parquet_subset(
+    source,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[tuple]] = None,
+    cache_dir: Optional[Path] = None
+) -> pd.DataFrame:
+    """
+    Read a parquet file from a local path or URL, keeping only what is asked for.
+
+    Unrequested columns are never decoded and filters are pushed into the
+    scan. Requested columns and filter columns missing from the file are
+    skipped rather than raising.
+
+    Args:
+        source: Local path or remote URL of a parquet file
+        columns: Optional list of columns to read (default: all)
+        filters: Optional pyarrow-style (column, op, value) row filters, ANDed.
+            A coarse pre-filter - callers still apply their exact row selection.
+        cache_dir: Optional directory that remote downloads go through (fetch_cached)
+
+    Returns:
+        DataFrame with the requested columns and rows
+    """
+    if isinstance(source, str) and source.startswith(('http://', 'https://')):
+        if cache_dir is not None:
+            source = fetch_cached(source, cache_dir)
+        elif columns is not None or filters is not None:
+            with urllib.request.urlopen(source, timeout=FETCH_TIMEOUT) as response:
+                source = io.BytesIO(response.read())
+    if columns is None and filters is None:
+        return pd.read_parquet(source)
+    available = set(pq.read_schema(source).names)
+    if columns is not None:
+        columns = [c for c in columns if c in available]
+    if filters is not None:
+        filters = [f for f in filters if f[0] in available] or None
+    try:
+        return pd.read_parquet(source, columns=columns, filters=filters)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, TypeError):
+        # Filter values not comparable with this file's column types
+        return pd.read_parquet(source, columns=columns)
+
+
 def load_parquet_with_fallback(
     remote_patterns: List[str],
     local_patterns: List[Path],
     data_type: str = "data",
-    verbose: bool = True
+    verbose: bool = True,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[tuple]] = None,
+    cache_dir: Optional[Path] = None
 ) -> pd.DataFrame:
     """
     Load parquet data from remote URLs with local file fallback.
@@ -52,6 +159,9 @@ def load_parquet_with_fallback(
         local_patterns: List of local file paths to try if remote fails
         data_type: Description for logging (e.g., "team box", "player box")
         verbose: Whether to print status messages
+        columns: Optional list of columns to read (default: all)
+        filters: Optional row filters pushed into parquet reads (not applied to RDS)
+        cache_dir: Optional directory for reusing remote downloads across runs
 
     Returns:
         DataFrame with loaded data, or empty DataFrame if all sources fail
@@ -63,14 +173,18 @@ def load_parquet_with_fallback(
                 print(f"Trying remote: {url}")
             if url.endswith('.rds'):
                 # RDS files need to be downloaded first
-                import tempfile
-                import urllib.request
-                with tempfile.TemporaryDirectory() as tmpdir:
-                    filepath = Path(tmpdir) / "data.rds"
-                    urllib.request.urlretrieve(url, filepath)
-                    df = load_rds_file(filepath)
+                if cache_dir is not None:
+                    df = load_rds_file(fetch_cached(url, cache_dir))
+                else:
+                    import tempfile
+                    with tempfile.TemporaryDirectory() as tmpdir:
+                        filepath = Path(tmpdir) / "data.rds"
+                        urllib.request.urlretrieve(url, filepath)
+                        df = load_rds_file(filepath)
+                if columns is not None:
+                    df = df[[c for c in columns if c in df.columns]]
             else:
-                df = pd.read_parquet(url)
+                df = read_parquet_subset(url, columns, filters, cache_dir)
             if verbose:
                 print(f"  ✓ Loaded {len(df)} {data_type} rows from remote")
             return df
@@ -86,8 +200,10 @@ def load_parquet_with_fallback(
                     print(f"Trying local: {local_path}")
                 if local_path.suffix == '.rds':
                     df = load_rds_file(local_path)
+                    if columns is not None:
+                        df = df[[c for c in columns if c in df.columns]]
                 else:
-                    df = pd.read_parquet(local_path)
+                    df = read_parquet_subset(local_path, columns, filters)
                 if verbose:
                     print(f"  ✓ Loaded {len(df)} {data_type} rows from local")
                 return df
@@ -100,7 +216,13 @@ def load_parquet_with_fallback(
     return pd.DataFrame()
 
 
-def load_team_box(season: int = 2025, data_dir: Optional[Path] = None, verbose: bool = True) -> pd.DataFrame:
+def load_team_box(
+    season: int = 2025,
+    data_dir: Optional[Path] = None,
+    verbose: bool = True,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[tuple]] = None
+) -> pd.DataFrame:
     """
     Load team box score data from wehoop releases or local fallback.
 
@@ -108,6 +230,8 @@ def load_team_box(season: int = 2025, data_dir: Optional[Path] = None, verbose:
         season: Season year (e.g., 2025 for 2024-25 season)
         data_dir: Base data directory (defaults to 'data/')
         verbose: Whether to print status messages
+        columns: Optional list of columns to read (default: all)
+        filters: Optional pyarrow-style row filters, e.g. [('game_date', '>=', date)]
 
     Returns:
         DataFrame with team box score data
@@ -142,11 +266,20 @@ def load_team_box(season: int = 2025, data_dir: Optional[Path] = None, verbose:
         remote_patterns=remote_patterns,
         local_patterns=local_patterns,
         data_type="team box",
-        verbose=verbose
+        verbose=verbose,
+        columns=columns,
+        filters=filters,
+        cache_dir=data_dir / "_cache"
     )
 
 
-def load_player_box(season: int = 2025, data_dir: Optional[Path] = None, verbose: bool = True) -> pd.DataFrame:
+def load_player_box(
+    season: int = 2025,
+    data_dir: Optional[Path] = None,
+    verbose: bool = True,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[tuple]] = None
+) -> pd.DataFrame:
     """
     Load player box score data from wehoop releases or local fallback.
 
@@ -154,6 +287,8 @@ def load_player_box(season: int = 2025, data_dir: Optional[Path] = None, verbose
         season: Season year (e.g., 2025 for 2024-25 season)
         data_dir: Base data directory (defaults to 'data/')
         verbose: Whether to print status messages
+        columns: Optional list of columns to read (default: all)
+        filters: Optional pyarrow-style row filters, e.g. [('game_date', '>=', date)]
 
     Returns:
         DataFrame with player box score data
@@ -188,11 +323,20 @@ def load_player_box(season: int = 2025, data_dir: Optional[Path] = None, verbose
         remote_patterns=remote_patterns,
         local_patterns=local_patterns,
         data_type="player box",
-        verbose=verbose
+        verbose=verbose,
+        columns=columns,
+        filters=filters,
+        cache_dir=data_dir / "_cache"
     )
 
 
-def load_pbp(season: int = 2025, data_dir: Optional[Path] = None, verbose: bool = True) -> pd.DataFrame:
+def load_pbp(
+    season: int = 2025,
+    data_dir: Optional[Path] = None,
+    verbose: bool = True,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[tuple]] = None
+) -> pd.DataFrame:
     """
     Load play-by-play data from wehoop releases or local fallback.
 
@@ -200,6 +344,8 @@ def load_pbp(season: int = 2025, data_dir: Optional[Path] = None, verbose: bool
         season: Season year (e.g., 2025 for 2024-25 season)
         data_dir: Base data directory (defaults to 'data/')
         verbose: Whether to print status messages
+        columns: Optional list of columns to read (default: all)
+        filters: Optional pyarrow-style row filters, e.g. [('game_date', '>=', date)]
 
     Returns:
         DataFrame with play-by-play data
@@ -237,6 +383,9 @@ def load_pbp(season: int = 2025, data_dir: Optional[Path] = None, verbose: bool
         remote_patterns=remote_patterns,
         local_patterns=local_patterns,
         data_type="play-by-play",
-        verbose=verbose
+        verbose=verbose,
+        columns=columns,
+        filters=filters,
+        cache_dir=data_dir / "_cache"
     )
 
@@ -9,7 +9,43 @@ Reference: Basketball-Reference, Cleaning the Glass, KenPom methodology.
 
 import pandas as pd
 import numpy as np
-from typing import Optional, Union
+from typing import Optional, Sequence, Union
+
+# Optional: numba fuses the team rate block into one compiled pass
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+# =============================================================================
+# STORAGE DTYPES
+# =============================================================================
+
+# Box score counts fit in int16; rates are computed in float64 and stored as float32
+COUNT_DTYPE = 'int16'
+RATE_DTYPE = 'float32'
+
+
+def apply_dtype_policy(df: pd.DataFrame,
+                       counts: Sequence[str] = (),
+                       rates: Sequence[str] = ()) -> pd.DataFrame:
+    """
+    Cast columns to their storage dtypes, skipping any not present in `df`.
+
+    Count columns are coerced to numbers (missing as 0) and stored as
+    COUNT_DTYPE. Rate columns are stored as RATE_DTYPE; cast them only once
+    all derived math has run so it stays in float64.
+    Modifies `df` in place and returns it.
+    """
+    for col in counts:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(COUNT_DTYPE)
+    rates = [c for c in rates if c in df.columns]
+    if rates:
+        df[rates] = df[rates].astype(RATE_DTYPE)
+    return df
 
 
 # =============================================================================
@@ -58,6 +94,29 @@ def estimate_possessions_team(team_df: pd.DataFrame) -> pd.Series:
     )
 
 
+def estimate_possessions_box(box_df: pd.DataFrame) -> pd.Series:
+    """
+    Estimate possessions for every row of a wehoop team box score.
+
+    Like estimate_possessions_team, but missing columns count as 0 and
+    turnovers fall back to total_turnovers where zero or missing.
+    """
+    tov = numeric_column(box_df, 'turnovers')
+    return estimate_possessions(
+        fga=numeric_column(box_df, 'field_goals_attempted'),
+        fta=numeric_column(box_df, 'free_throws_attempted'),
+        orb=numeric_column(box_df, 'offensive_rebounds'),
+        tov=tov.where(tov != 0, numeric_column(box_df, 'total_turnovers'))
+    )
+
+
+def numeric_column(df: pd.DataFrame, col: str) -> pd.Series:
+    """Column as float64 with missing values (or a missing column) as 0."""
+    if col not in df.columns:
+        return pd.Series(0.0, index=df.index)
+    return pd.to_numeric(df[col], errors='coerce').fillna(0).astype('float64')
+
+
 # =============================================================================
 # SHOOTING EFFICIENCY METRICS
 # =============================================================================
@@ -336,6 +395,93 @@ def calc_per_minute(stat: Union[pd.Series, float],
     return stat * per / minutes if minutes > 0 else 0.0
 
 
+# =============================================================================
+# FUSED TEAM RATES
+# =============================================================================
+
+# Shorthand box score columns read by add_team_rates
+TEAM_RATE_INPUTS = ['fgm', 'fga', 'fg3m', 'fg3a', 'ftm', 'fta', 'ast', 'tov', 'pts', 'poss_est']
+
+# Output order of the fused team rate computation
+TEAM_RATE_COLUMNS = [
+    'fg_pct', 'fg2_pct', 'fg3_pct', 'ft_pct', 'efg_pct', 'ts_pct',
+    'fg3_rate', 'ftr', 'tov_pct', 'ast_pct', 'ast_tov', 'ortg'
+]
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, cache=True)
+    def _team_rates_kernel(fgm, fga, fg3m, fg3a, ftm, fta, ast, tov, pts, poss, fill, out):
+        for i in prange(fga.shape[0]):
+            fg2m = fgm[i] - fg3m[i]
+            fg2a = fga[i] - fg3a[i]
+            ts_den = 2 * (fga[i] + 0.44 * fta[i])
+            out[i, 0] = fgm[i] / fga[i] if fga[i] > 0 else fill
+            out[i, 1] = fg2m / fg2a if fg2a > 0 else fill
+            out[i, 2] = fg3m[i] / fg3a[i] if fg3a[i] > 0 else fill
+            out[i, 3] = ftm[i] / fta[i] if fta[i] > 0 else fill
+            out[i, 4] = (fgm[i] + 0.5 * fg3m[i]) / fga[i] if fga[i] > 0 else fill
+            out[i, 5] = pts[i] / ts_den if ts_den > 0 else fill
+            out[i, 6] = fg3a[i] / fga[i] if fga[i] > 0 else fill
+            out[i, 7] = fta[i] / fga[i] if fga[i] > 0 else fill
+            out[i, 8] = tov[i] / poss[i] if poss[i] > 0 else fill
+            out[i, 9] = ast[i] / fgm[i] if fgm[i] > 0 else fill
+            out[i, 10] = ast[i] / tov[i] if tov[i] > 0 else ast[i]
+            out[i, 11] = 100 * pts[i] / poss[i] if poss[i] > 0 else fill
+
+
+def _rate(num, den, fill=0.0):
+    """num / den as float64, with `fill` where den <= 0."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den > 0, num / den, fill)
+
+
+def team_rates(fgm, fga, fg3m, fg3a, ftm, fta, ast, tov, pts, poss,
+               fill: float = 0.0) -> np.ndarray:
+    """
+    Compute TEAM_RATE_COLUMNS as an (n, 12) float64 array from float64 inputs.
+
+    Rates with a zero denominator are `fill`, except ast_tov, which falls
+    back to the raw assist count. Uses the numba kernel when available,
+    else one numpy expression per rate.
+    """
+    if HAS_NUMBA:
+        out = np.empty((len(fga), len(TEAM_RATE_COLUMNS)), dtype=np.float64)
+        _team_rates_kernel(fgm, fga, fg3m, fg3a, ftm, fta, ast, tov, pts, poss, fill, out)
+        return out
+
+    fg2m = fgm - fg3m
+    fg2a = fga - fg3a
+    return np.column_stack([
+        _rate(fgm, fga, fill),
+        _rate(fg2m, fg2a, fill),
+        _rate(fg3m, fg3a, fill),
+        _rate(ftm, fta, fill),
+        _rate(fgm + 0.5 * fg3m, fga, fill),
+        _rate(pts, 2 * (fga + 0.44 * fta), fill),
+        _rate(fg3a, fga, fill),
+        _rate(fta, fga, fill),
+        _rate(tov, poss, fill),
+        _rate(ast, fgm, fill),
+        _rate(ast, tov, fill=ast),
+        _rate(100 * pts, poss, fill),
+    ])
+
+
+def add_team_rates(df: pd.DataFrame,
+                   columns: Sequence[str] = TEAM_RATE_COLUMNS,
+                   fill: float = 0.0) -> pd.DataFrame:
+    """
+    Add the team rate `columns` (a subset of TEAM_RATE_COLUMNS) computed
+    from the TEAM_RATE_INPUTS shorthand columns. See team_rates for `fill`.
+    Modifies `df` in place and returns it.
+    """
+    rates = team_rates(*(df[col].to_numpy(dtype=np.float64) for col in TEAM_RATE_INPUTS), fill=fill)
+    for col in columns:
+        df[col] = rates[:, TEAM_RATE_COLUMNS.index(col)]
+    return df
+
+
 # =============================================================================
 # BATCH CALCULATION FUNCTIONS
 # =============================================================================
@@ -9,21 +9,30 @@ Usage:
     python weekly_pull.py --start-date 2026-02-01  # Pull from specific date
     python weekly_pull.py --force-refresh true     # Re-pull all games in range
     python weekly_pull.py --full-season true       # Process entire season
+    python weekly_pull.py --emit-csv true          # Also write Tableau CSV copies
 
-Outputs (Tableau-ready CSVs):
-    data/processed/game_summary.csv      - Team game stats with all derived metrics
-    data/processed/player_game.csv       - Player game stats with advanced metrics
-    data/processed/shooting_zones.csv    - Zone-level shooting breakdown (from PBP)
+Outputs (Tableau-ready parquet, plus CSV copies with --emit-csv):
+    data/processed/game_summary.parquet  - Team game stats with all derived metrics
+    data/processed/player_game.parquet   - Player game stats with advanced metrics
+    data/processed/shooting_zones.parquet - Zone-level shooting breakdown (from PBP)
 """
 
 import argparse
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pandas.api.types import union_categoricals
 from datetime import datetime, timedelta
 from pathlib import Path
 import warnings
 
 from data_loader import load_team_box, load_player_box, load_pbp, WEHOOP_BASE
+from metrics import TEAM_RATE_COLUMNS, add_team_rates, apply_dtype_policy, estimate_possessions_box
 
 warnings.filterwarnings('ignore')
 
@@ -54,25 +63,69 @@ TEAM_PCTILE_METRICS = [
 # Metrics where LOWER is better (invert percentile)
 INVERTED_METRICS = ['tov_pct', 'drtg']
 
+# PBP columns used by shooting zone processing (box scores are kept whole -
+# their raw columns pass through to the Tableau outputs)
+PBP_COLUMNS = [
+    'game_id', 'team_id', 'text', 'type_text', 'scoring_play',
+    'coordinate_x', 'coordinate_y'
+]
+
 # ============================================================================
 # DATA LOADING
 # ============================================================================
 
+def as_game_ids(values):
+    """
+    Game IDs as an int64 ndarray, whatever dtype they were stored with
+    (int32 from wehoop parquet, int64 tracking, or strings from older files).
+    """
+    values = pd.Series(values) if not isinstance(values, pd.Series) else values
+    if not pd.api.types.is_integer_dtype(values.dtype):
+        values = pd.to_numeric(values, errors='coerce').astype('Int64')
+        return values.to_numpy(dtype=np.int64, na_value=-1)
+    return values.to_numpy(dtype=np.int64)
+
+
 def load_processed_games():
-    """Load list of already-processed game IDs."""
+    """Load already-processed game IDs as a sorted int64 array."""
     if PROCESSED_GAMES_FILE.exists():
-        df = pd.read_parquet(PROCESSED_GAMES_FILE)
-        return set(df['game_id'].tolist())
-    return set()
+        ids = pq.read_table(PROCESSED_GAMES_FILE, columns=['game_id']).column('game_id').to_pandas()
+        return np.unique(as_game_ids(ids))
+    return np.empty(0, dtype=np.int64)
 
 
 def save_processed_games(game_ids):
-    """Save updated list of processed game IDs."""
-    df = pd.DataFrame({'game_id': list(game_ids)})
+    """Save updated list of processed game IDs (sorted, unique)."""
+    df = pd.DataFrame({'game_id': np.unique(as_game_ids(game_ids))})
     df.to_parquet(PROCESSED_GAMES_FILE, index=False)
     df.to_csv(PROCESSED_GAMES_FILE.with_suffix('.csv'), index=False)
 
 
+def game_id_mask(game_id_col, game_ids):
+    """
+    Boolean mask of rows whose game_id is in `game_ids`.
+    Runs np.isin over int64 arrays instead of probing a Python set per row.
+    """
+    if isinstance(game_ids, np.ndarray) and game_ids.dtype == np.int64:
+        ids = game_ids
+    else:
+        ids = as_game_ids(list(game_ids))
+    return np.isin(as_game_ids(game_id_col), ids)
+
+
+def parse_game_dates(values):
+    """
+    game_date as datetime64. Columns that are already datetime64 pass through;
+    ISO date strings take the fixed-format parser. Parquet date32 values
+    (datetime.date objects) use the default path, which dedupes via cache.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if pd.api.types.infer_dtype(values, skipna=True) == 'string':
+        return pd.to_datetime(values, format='ISO8601', cache=True)
+    return pd.to_datetime(values, cache=True)
+
+
 def load_benchmarks():
     """Load D1 benchmark data for percentile calculations."""
     benchmark_file = BENCHMARKS_DIR / 'd1_benchmarks_current.csv'
@@ -139,21 +192,16 @@ def join_opponent_stats(df):
 # TEAM METRIC CALCULATIONS
 # ============================================================================
 
-def calculate_possessions(row):
-    """Dean Oliver possession estimate: Poss = FGA + 0.44 * FTA - ORB + TOV"""
-    fga = row.get('field_goals_attempted', 0) or 0
-    fta = row.get('free_throws_attempted', 0) or 0
-    orb = row.get('offensive_rebounds', 0) or 0
-    tov = row.get('turnovers', 0) or row.get('total_turnovers', 0) or 0
-    return max(fga + 0.44 * fta - orb + tov, 1)
+# Team rate columns narrowed to their storage dtype when the outputs are written
+TEAM_STORED_RATE_COLUMNS = TEAM_RATE_COLUMNS + ['poss_est', 'opp_poss_est', 'pace', 'stl_pct']
 
 
 def calculate_team_metrics(df):
     """
     Calculate all derived team metrics per TARGET_DATA_SCHEMA.
+    Modifies `df` in place and returns it.
     """
     print("Calculating team metrics...")
-    df = df.copy()
 
     # Ensure numeric types
     numeric_cols = [
@@ -166,9 +214,7 @@ def calculate_team_metrics(df):
         'fast_break_points', 'points_in_paint', 'turnovers_points', 'largest_lead'
     ]
 
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    apply_dtype_policy(df, counts=numeric_cols)
 
     # === STANDARDIZED COLUMN NAMES ===
     df['pts'] = df.get('team_score', df.get('points', pd.Series([0]*len(df))))
@@ -207,29 +253,11 @@ def calculate_team_metrics(df):
         df['result'] = np.where(df['pts'] > df['opp_pts'], 'W', 'L')
 
     # === POSSESSIONS ===
-    df['poss_est'] = df.apply(calculate_possessions, axis=1)
+    # Dean Oliver estimate: Poss = FGA + 0.44 * FTA - ORB + TOV
+    df['poss_est'] = estimate_possessions_box(df)
 
-    # === SHOOTING METRICS ===
-    df['fg_pct'] = np.where(df['fga'] > 0, df['fgm'] / df['fga'], 0)
-    df['fg2_pct'] = np.where(df['fg2a'] > 0, df['fg2m'] / df['fg2a'], 0)
-    df['fg3_pct'] = np.where(df['fg3a'] > 0, df['fg3m'] / df['fg3a'], 0)
-    df['ft_pct'] = np.where(df['fta'] > 0, df['ftm'] / df['fta'], 0)
-    df['efg_pct'] = np.where(df['fga'] > 0, (df['fgm'] + 0.5 * df['fg3m']) / df['fga'], 0)
-    df['ts_pct'] = np.where(
-        (df['fga'] + 0.44 * df['fta']) > 0,
-        df['pts'] / (2 * (df['fga'] + 0.44 * df['fta'])),
-        0
-    )
-    df['fg3_rate'] = np.where(df['fga'] > 0, df['fg3a'] / df['fga'], 0)
-    df['ftr'] = np.where(df['fga'] > 0, df['fta'] / df['fga'], 0)
-
-    # === BALL MOVEMENT ===
-    df['tov_pct'] = np.where(df['poss_est'] > 0, df['tov'] / df['poss_est'], 0)
-    df['ast_pct'] = np.where(df['fgm'] > 0, df['ast'] / df['fgm'], 0)
-    df['ast_tov'] = np.where(df['tov'] > 0, df['ast'] / df['tov'], df['ast'])
-
-    # === OFFENSIVE RATING ===
-    df['ortg'] = np.where(df['poss_est'] > 0, 100 * df['pts'] / df['poss_est'], 0)
+    # === SHOOTING / BALL MOVEMENT / OFFENSIVE RATING ===
+    add_team_rates(df)
     df['pace'] = df['poss_est']
 
     # === MISC SCORING (if available) ===
@@ -255,9 +283,9 @@ def calculate_defensive_metrics(df):
     """
     Calculate defensive metrics that require opponent data.
     Must be called after join_opponent_stats().
+    Modifies `df` in place and returns it.
     """
     print("Calculating defensive metrics...")
-    df = df.copy()
 
     # Get opponent points - handle various column names from join
     opp_pts_cols = ['opp_team_score', 'opp_pts_y', 'opp_pts_x', 'opp_pts', 'opponent_team_score']
@@ -326,7 +354,7 @@ def calculate_defensive_metrics(df):
     # Clean up merge artifacts
     drop_cols = [c for c in df.columns if c.endswith('_x') or c.endswith('_y')]
     if drop_cols:
-        df = df.drop(columns=drop_cols, errors='ignore')
+        df.drop(columns=drop_cols, inplace=True)
 
     print(f"  Added defensive metrics (DRtg, Net Rtg, OREB%, DREB%, etc.)")
     return df
@@ -335,9 +363,9 @@ def calculate_defensive_metrics(df):
 def calculate_rolling_averages(df, window=5):
     """
     Calculate rolling averages for key metrics (last N games per team).
+    Returns a new frame sorted by team and date.
     """
     print(f"Calculating rolling {window}-game averages...")
-    df = df.copy()
 
     if 'game_date' not in df.columns or 'team_id' not in df.columns:
         print("  Cannot calculate rolling averages - missing required columns")
@@ -366,9 +394,9 @@ def calculate_rolling_averages(df, window=5):
 def calculate_player_metrics(df, team_totals=None):
     """
     Calculate all derived player metrics per TARGET_DATA_SCHEMA.
+    Modifies `df` in place and returns it (a new frame if team_totals is given).
     """
     print("Calculating player metrics...")
-    df = df.copy()
 
     # Ensure numeric types
     numeric_cols = [
@@ -468,8 +496,8 @@ def calculate_usage_pct(player_df, team_df):
     """
     Calculate true Usage % using team totals.
     USG% = 100 * ((FGA + 0.44*FTA + TOV) * (Team_MP / 5)) / (MP * (Team_FGA + 0.44*Team_FTA + Team_TOV))
+    Returns a new frame (team totals are merged in).
     """
-    player_df = player_df.copy()
 
     # Prepare team totals per game
     team_totals = team_df.groupby('game_id').agg({
@@ -510,15 +538,14 @@ def calculate_percentiles_vs_benchmarks(df, benchmark_df, metrics):
     """
     Calculate percentiles against D1 benchmarks.
     Uses linear interpolation between benchmark percentile breakpoints.
+    Modifies `df` in place and returns it.
     """
     print("Calculating percentiles vs D1 benchmarks...")
-    df = df.copy()
 
     if benchmark_df.empty:
         print("  No benchmark data - using within-sample percentiles")
-        for metric in metrics:
-            if metric in df.columns:
-                df[f'{metric}_pctile'] = df[metric].rank(pct=True) * 100
+        present = [m for m in metrics if m in df.columns]
+        df[[f'{m}_pctile' for m in present]] = df[present].rank(pct=True).to_numpy() * 100
         return df
 
     for metric in metrics:
@@ -551,43 +578,37 @@ def calculate_percentiles_vs_benchmarks(df, benchmark_df, metrics):
         xp = [b[1] for b in breakpoints]  # benchmark values (must be increasing)
         fp = [b[0] for b in breakpoints]  # percentile values
 
-        def interpolate_pctile(value):
-            if pd.isna(value):
-                return np.nan
-
-            # np.interp handles edge cases with left/right bounds
-            pctile = np.interp(value, xp, fp, left=fp[0], right=fp[-1])
+        # One np.interp over the column; edge values clamp to the outer
+        # breakpoints and NaN stays NaN
+        pctile = np.interp(df[metric].to_numpy(dtype=np.float64), xp, fp, left=fp[0], right=fp[-1])
 
-            # Invert for metrics where lower is better
-            if metric in INVERTED_METRICS:
-                return 100 - pctile
-            return pctile
-
-        df[f'{metric}_pctile'] = df[metric].apply(interpolate_pctile)
+        # Invert for metrics where lower is better
+        if metric in INVERTED_METRICS:
+            pctile = 100 - pctile
+        df[f'{metric}_pctile'] = pctile
 
     print(f"  Calculated percentiles for {len(metrics)} metrics")
     return df
 
 
+# Percentile label tiers: a percentile >= PCTILE_LABEL_BINS[i - 1] gets PCTILE_LABELS[i]
+PCTILE_LABEL_BINS = [25, 40, 60, 75, 90]
+PCTILE_LABELS = np.array(['Low', 'Below Average', 'Average', 'Above Average', 'Great', 'Elite'])
+
+
 def assign_percentile_labels(df, metrics):
     """
     Assign categorical labels based on percentile values.
+    All metrics are binned together with one np.digitize over the 2D array.
     """
-    for metric in metrics:
-        pctile_col = f'{metric}_pctile'
-        if pctile_col not in df.columns:
-            continue
+    metrics = [m for m in metrics if f'{m}_pctile' in df.columns]
+    if not metrics:
+        return df
 
-        label_col = f'{metric}_label'
-        conditions = [
-            df[pctile_col] >= 90,
-            df[pctile_col] >= 75,
-            df[pctile_col] >= 60,
-            df[pctile_col] >= 40,
-            df[pctile_col] >= 25,
-        ]
-        choices = ['Elite', 'Great', 'Above Average', 'Average', 'Below Average']
-        df[label_col] = np.select(conditions, choices, default='Low')
+    pctiles = df[[f'{m}_pctile' for m in metrics]].to_numpy(dtype=np.float64)
+    tiers = np.digitize(pctiles, PCTILE_LABEL_BINS)
+    tiers[np.isnan(pctiles)] = 0  # Missing percentiles are labelled 'Low'
+    df[[f'{m}_label' for m in metrics]] = PCTILE_LABELS[tiers]
 
     return df
 
@@ -596,6 +617,83 @@ def assign_percentile_labels(df, metrics):
 # PLAY-BY-PLAY PROCESSING
 # ============================================================================
 
+# Zone name -> (zone_type, zone_id)
+SHOT_ZONES = {
+    'At The Rim': ('Paint', 1),
+    'In The Paint': ('Paint', 2),
+    'Left Baseline 2s': ('Midrange', 3),
+    'Right Baseline 2s': ('Midrange', 4),
+    'Left Elbow 2s': ('Midrange', 5),
+    'Right Elbow 2s': ('Midrange', 6),
+    'Midrange': ('Midrange', 5),
+    'Unknown 2PT': ('Midrange', 5),
+    'Left Corner 3s': ('3PT', 7),
+    'Right Corner 3s': ('3PT', 8),
+    'Corner 3s': ('3PT', 7),  # Default to left
+    'Left Wing 3s': ('3PT', 9),
+    'Right Wing 3s': ('3PT', 10),
+    'Wing 3s': ('3PT', 9),
+    'Top of Key 3s': ('3PT', 11),
+}
+
+# Shot event filters, compiled once at import
+SHOT_TYPE_RE = re.compile(r'made shot|missed shot|made|missed', re.IGNORECASE)
+SHOT_TEXT_RE = re.compile(r'shot|jumper|layup|dunk|three|3-pointer', re.IGNORECASE)
+
+
+def classify_shot_zones(text_lower):
+    """
+    Classify shot descriptions into zone names.
+    Expects an already-lowercased Series of PBP text.
+    """
+    def has_any(keywords):
+        mask = pd.Series(False, index=text_lower.index)
+        for kw in keywords:
+            mask |= text_lower.str.contains(kw, regex=False, na=False)
+        return mask
+
+    left = has_any(['left'])
+    right = has_any(['right'])
+
+    # Check for 3-pointers
+    is_three = has_any(['three', '3-pt', '3-pointer', '3pt'])
+    corner = is_three & has_any(['corner'])
+    wing = is_three & ~corner & has_any(['wing'])
+
+    # Check for paint/rim shots
+    rim = ~is_three & has_any(['layup', 'dunk', 'at the rim', 'at rim'])
+    paint = ~is_three & ~rim & has_any(['in the paint', 'paint', 'close range'])
+
+    # Check for midrange
+    mid = ~is_three & ~rim & ~paint & has_any(['jumper', 'jump shot', 'mid-range', 'midrange', 'elbow'])
+    baseline = mid & has_any(['baseline'])
+    elbow = mid & has_any(['elbow', 'free throw'])
+
+    conditions = [
+        corner & left, corner & right, corner,
+        wing & left, wing & right, wing,
+        is_three,
+        rim,
+        paint,
+        baseline & left, baseline & right,
+        elbow & left, elbow & right,
+        mid,
+    ]
+    choices = [
+        'Left Corner 3s', 'Right Corner 3s', 'Corner 3s',
+        'Left Wing 3s', 'Right Wing 3s', 'Wing 3s',
+        'Top of Key 3s',
+        'At The Rim',
+        'In The Paint',
+        'Left Baseline 2s', 'Right Baseline 2s',
+        'Left Elbow 2s', 'Right Elbow 2s',
+        'Midrange',
+    ]
+    # Unknown - classify as general 2-pointer
+    zones = np.select(conditions, choices, default='Unknown 2PT')
+    return pd.Series(zones, index=text_lower.index)
+
+
 def process_pbp_shooting_zones(pbp_df, team_box_df):
     """
     Derive zone-level shooting from play-by-play data.
@@ -608,10 +706,9 @@ def process_pbp_shooting_zones(pbp_df, team_box_df):
         return pd.DataFrame()
 
     # Filter to shot events
-    shot_types = ['Made Shot', 'Missed Shot', 'made', 'missed']
     shot_events = pbp_df[
-        pbp_df['type_text'].str.contains('|'.join(shot_types), case=False, na=False) |
-        pbp_df['text'].str.contains('shot|jumper|layup|dunk|three|3-pointer', case=False, na=False)
+        pbp_df['type_text'].str.contains(SHOT_TYPE_RE, na=False) |
+        pbp_df['text'].str.contains(SHOT_TEXT_RE, na=False)
     ].copy()
 
     if shot_events.empty:
@@ -620,65 +717,18 @@ def process_pbp_shooting_zones(pbp_df, team_box_df):
 
     print(f"  Found {len(shot_events)} shot events")
 
-    # Determine shot zones from description
-    def classify_shot_zone(row):
-        text = str(row.get('text', '')).lower()
-
-        # Check for 3-pointers
-        if any(x in text for x in ['three', '3-pt', '3-pointer', '3pt']):
-            if 'corner' in text:
-                if 'left' in text:
-                    return ('Left Corner 3s', '3PT', 7)
-                elif 'right' in text:
-                    return ('Right Corner 3s', '3PT', 8)
-                return ('Corner 3s', '3PT', 7)  # Default to left
-            elif 'wing' in text:
-                if 'left' in text:
-                    return ('Left Wing 3s', '3PT', 9)
-                elif 'right' in text:
-                    return ('Right Wing 3s', '3PT', 10)
-                return ('Wing 3s', '3PT', 9)
-            else:
-                return ('Top of Key 3s', '3PT', 11)
-
-        # Check for paint/rim shots
-        if any(x in text for x in ['layup', 'dunk', 'at the rim', 'at rim']):
-            return ('At The Rim', 'Paint', 1)
-        if any(x in text for x in ['in the paint', 'paint', 'close range']):
-            return ('In The Paint', 'Paint', 2)
-
-        # Check for midrange
-        if any(x in text for x in ['jumper', 'jump shot', 'mid-range', 'midrange', 'elbow']):
-            if 'baseline' in text:
-                if 'left' in text:
-                    return ('Left Baseline 2s', 'Midrange', 3)
-                elif 'right' in text:
-                    return ('Right Baseline 2s', 'Midrange', 4)
-            if 'elbow' in text or 'free throw' in text:
-                if 'left' in text:
-                    return ('Left Elbow 2s', 'Midrange', 5)
-                elif 'right' in text:
-                    return ('Right Elbow 2s', 'Midrange', 6)
-            return ('Midrange', 'Midrange', 5)  # Default
-
-        # Default: try to infer from coordinates if available
-        if 'coordinate_x' in row and 'coordinate_y' in row:
-            x, y = row.get('coordinate_x'), row.get('coordinate_y')
-            if pd.notna(x) and pd.notna(y):
-                # Basic coordinate classification (would need court dimensions)
-                pass
-
-        # Unknown - classify as general 2-pointer
-        return ('Unknown 2PT', 'Midrange', 5)
+    # Lowercase descriptions once; all keyword checks below run on these
+    text_lower = shot_events['text'].str.lower()
+    type_text_lower = shot_events['type_text'].str.lower()
 
     # Classify shots
-    shot_events[['zone_name', 'zone_type', 'zone_id']] = shot_events.apply(
-        classify_shot_zone, axis=1, result_type='expand'
-    )
+    shot_events['zone_name'] = classify_shot_zones(text_lower)
+    shot_events['zone_type'] = shot_events['zone_name'].map({z: t for z, (t, _) in SHOT_ZONES.items()})
+    shot_events['zone_id'] = shot_events['zone_name'].map({z: i for z, (_, i) in SHOT_ZONES.items()})
 
     # Determine if made or missed
     shot_events['made'] = (
-        shot_events['type_text'].str.contains('Made', case=False, na=False) |
+        type_text_lower.str.contains('made', regex=False, na=False) |
         shot_events['scoring_play'].fillna(False).astype(bool)
     )
 
@@ -702,9 +752,18 @@ def process_pbp_shooting_zones(pbp_df, team_box_df):
 
     zone_agg['fg_pct'] = np.where(zone_agg['fga'] > 0, zone_agg['fgm'] / zone_agg['fga'], 0)
 
-    # Calculate FGA share per game/team
-    team_fga = zone_agg.groupby(['game_id', 'team_id'])['fga'].transform('sum')
-    zone_agg['fga_pct'] = np.where(team_fga > 0, zone_agg['fga'] / team_fga, 0)
+    # Calculate FGA share per game/team. The groupby above leaves rows sorted by
+    # (game_id, team_id), so team totals are contiguous runs -> reduceat.
+    # groupby drops NaN keys, so zone_agg can be empty; reduceat needs >= 1 row.
+    fga = zone_agg['fga'].to_numpy(dtype=np.float64)
+    team_fga = np.zeros_like(fga)
+    if len(fga) > 0:
+        game_ids = zone_agg['game_id'].to_numpy()
+        team_ids = zone_agg['team_id'].to_numpy()
+        new_group = np.r_[True, (game_ids[1:] != game_ids[:-1]) | (team_ids[1:] != team_ids[:-1])]
+        starts = np.flatnonzero(new_group)
+        team_fga = np.repeat(np.add.reduceat(fga, starts), np.diff(np.r_[starts, len(fga)]))
+    zone_agg['fga_pct'] = np.divide(fga, team_fga, out=np.zeros_like(fga), where=team_fga > 0)
 
     print(f"  Generated {len(zone_agg)} zone-level shooting rows")
     return zone_agg
@@ -720,11 +779,117 @@ def extract_misc_scoring_from_pbp(pbp_df, team_df):
     return team_df
 
 
+# ============================================================================
+# OUTPUT WRITING
+# ============================================================================
+
+# Output parquet encoding: zstd with dictionary-encoded columns (team names,
+# labels and tiers repeat heavily) - smaller files than the snappy default
+PARQUET_WRITE_OPTIONS = {'compression': 'zstd', 'compression_level': 3, 'use_dictionary': True}
+PARQUET_ROW_GROUP_SIZE = 64_000
+
+
+def _unify_categoricals(left, right):
+    """
+    Give categorical columns present in both frames a shared category set
+    (union_categoricals) so pd.concat keeps them categorical instead of
+    falling back to object. Modifies both frames in place.
+    """
+    for col in left.columns.intersection(right.columns):
+        left_dtype, right_dtype = left[col].dtype, right[col].dtype
+        if not (isinstance(left_dtype, pd.CategoricalDtype) and isinstance(right_dtype, pd.CategoricalDtype)):
+            continue
+        if left_dtype == right_dtype or left_dtype.categories.dtype != right_dtype.categories.dtype:
+            continue
+        categories = union_categoricals([left[col], right[col]], ignore_order=True).categories
+        left[col] = left[col].cat.set_categories(categories)
+        right[col] = right[col].cat.set_categories(categories)
+
+
+def upsert_parquet(df, path, keys, overwrite=False):
+    """
+    Upsert rows into a parquet file, replacing existing rows that share `keys`.
+    With overwrite=True the existing file is replaced outright.
+
+    Only the key columns of the existing file are read to find replaced rows;
+    the surviving history is streamed batch-by-batch into the rewritten file
+    instead of being concatenated and re-deduplicated in memory.
+    Returns the total number of rows written.
+    """
+    new_table = pa.Table.from_pandas(df, preserve_index=False)
+
+    if overwrite or not path.exists():
+        pq.write_table(new_table, path, row_group_size=PARQUET_ROW_GROUP_SIZE, **PARQUET_WRITE_OPTIONS)
+        return new_table.num_rows
+
+    existing_file = pq.ParquetFile(path)
+    schema = existing_file.schema_arrow
+
+    # Cheap pre-check on the leading key (game_id): new games never overlap
+    # history in a normal incremental run, so the full key compare is skipped.
+    # Both sides go through as_game_ids so int32/int64/string IDs still match.
+    new_game_ids = as_game_ids(df[keys[0]])
+    lead_key = as_game_ids(pq.read_table(path, columns=keys[:1]).column(0).to_numpy())
+    replaced = np.isin(lead_key, new_game_ids)
+    if replaced.any():
+        existing_keys = pq.read_table(path, columns=keys).to_pandas()
+        existing_keys[keys[0]] = as_game_ids(existing_keys[keys[0]])
+        new_keys = df[keys].assign(**{keys[0]: new_game_ids})
+        replaced = pd.MultiIndex.from_frame(existing_keys).isin(pd.MultiIndex.from_frame(new_keys))
+    keep = pa.array(~replaced)
+
+    same_columns = set(new_table.column_names) == set(schema.names)
+    if same_columns:
+        try:
+            new_table = new_table.select(schema.names).cast(schema)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            # Types changed, e.g. a column stored as all-null now has values
+            same_columns = False
+
+    if not same_columns:
+        # Columns or types changed since the last run - rewrite the full union
+        existing = existing_file.read().to_pandas()[~replaced]
+        new_rows = df.copy(deep=False)
+        _unify_categoricals(existing, new_rows)
+        final = pd.concat([existing, new_rows], ignore_index=True)
+        final.to_parquet(path, index=False, row_group_size=PARQUET_ROW_GROUP_SIZE, **PARQUET_WRITE_OPTIONS)
+        return len(final)
+
+    # Single-file outputs are kept (Tableau and load_schedule_rankings read them
+    # directly). In the usual weekly run processed_games already excludes
+    # history, nothing is replaced, and the history is copied through as-is.
+    replaces_history = bool(replaced.any())
+
+    tmp_path = path.with_name(path.name + '.tmp')
+    with pq.ParquetWriter(tmp_path, schema, **PARQUET_WRITE_OPTIONS) as writer:
+        offset = 0
+        for batch in existing_file.iter_batches(batch_size=PARQUET_ROW_GROUP_SIZE):
+            # Advance by the unfiltered length so the keep mask stays aligned
+            n_rows = batch.num_rows
+            if replaces_history:
+                batch = batch.filter(keep.slice(offset, n_rows))
+            writer.write_batch(batch)
+            offset += n_rows
+        writer.write_table(new_table, row_group_size=PARQUET_ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+
+    return int(pc.sum(keep).as_py() or 0) + new_table.num_rows
+
+
+def write_csv_sidecar(parquet_path):
+    """
+    Mirror a parquet output as CSV for Tableau.
+    Uses pandas' writer so dates, timestamps, booleans and floats keep the
+    text format the Tableau extracts were built against.
+    """
+    pd.read_parquet(parquet_path).to_csv(parquet_path.with_suffix('.csv'), index=False)
+
+
 # ============================================================================
 # MAIN WORKFLOW
 # ============================================================================
 
-def process_games(start_date=None, force_refresh=False, full_season=False):
+def process_games(start_date=None, force_refresh=False, full_season=False, emit_csv=False):
     """Main processing workflow - creates Tableau-ready datasets."""
 
     print("=" * 70)
@@ -745,7 +910,7 @@ def process_games(start_date=None, force_refresh=False, full_season=False):
 
     # Load tracking
     if force_refresh:
-        processed_games = set()
+        processed_games = np.empty(0, dtype=np.int64)
         print("Force refresh enabled - will re-process all games")
     else:
         processed_games = load_processed_games()
@@ -753,9 +918,27 @@ def process_games(start_date=None, force_refresh=False, full_season=False):
 
     # Load source data
     print("\n--- Loading source data ---")
-    team_box = load_team_box(CURRENT_SEASON, DATA_DIR)
-    player_box = load_player_box(CURRENT_SEASON, DATA_DIR)
-    pbp = load_pbp(CURRENT_SEASON, DATA_DIR)
+    # Coarse date filter pushed into the parquet scans; exact filtering happens below.
+    # Half-open upper bound so end-day games survive when game_date is a timestamp.
+    date_filters = [
+        ('game_date', '>=', start.date()),
+        ('game_date', '<', end.date() + timedelta(days=1)),
+    ]
+
+    # Independent network-bound downloads - overlap them
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        team_future = executor.submit(
+            load_team_box, CURRENT_SEASON, DATA_DIR, filters=date_filters
+        )
+        player_future = executor.submit(
+            load_player_box, CURRENT_SEASON, DATA_DIR, filters=date_filters
+        )
+        pbp_future = executor.submit(
+            load_pbp, CURRENT_SEASON, DATA_DIR, columns=PBP_COLUMNS, filters=date_filters
+        )
+        team_box = team_future.result()
+        player_box = player_future.result()
+        pbp = pbp_future.result()
 
     if team_box.empty:
         print("ERROR: No team box data loaded. Exiting.")
@@ -768,21 +951,22 @@ def process_games(start_date=None, force_refresh=False, full_season=False):
 
     # Filter to date range
     if 'game_date' in team_box.columns:
-        team_box['game_date'] = pd.to_datetime(team_box['game_date'])
+        team_box['game_date'] = parse_game_dates(team_box['game_date'])
+        game_dates = team_box['game_date'].to_numpy()
         team_box = team_box[
-            (team_box['game_date'] >= start) &
-            (team_box['game_date'] <= end)
+            (game_dates >= pd.Timestamp(start).to_datetime64()) &
+            (game_dates <= pd.Timestamp(end).to_datetime64())
         ]
 
     print(f"\nGames in date range: {team_box['game_id'].nunique()}")
 
     # Filter out already-processed (unless force refresh)
     if not force_refresh:
-        new_games = team_box[~team_box['game_id'].isin(processed_games)]
+        new_games = team_box[~game_id_mask(team_box['game_id'], processed_games)]
     else:
         new_games = team_box
 
-    new_game_ids = set(new_games['game_id'].unique())
+    new_game_ids = np.unique(as_game_ids(new_games['game_id']))
     print(f"Games to process: {len(new_game_ids)}")
 
     if len(new_game_ids) == 0:
@@ -792,7 +976,8 @@ def process_games(start_date=None, force_refresh=False, full_season=False):
 
     # ===== TEAM PROCESSING =====
     print("\n--- Processing team data ---")
-    team_processed = calculate_team_metrics(new_games)
+    # One copy up front; the team transforms below mutate it in place
+    team_processed = calculate_team_metrics(new_games.copy())
     team_processed = join_opponent_stats(team_processed)
     team_processed = calculate_defensive_metrics(team_processed)
     team_processed = calculate_rolling_averages(team_processed, window=5)
@@ -802,50 +987,44 @@ def process_games(start_date=None, force_refresh=False, full_season=False):
     # ===== PLAYER PROCESSING =====
     print("\n--- Processing player data ---")
     if not player_box.empty:
-        player_filtered = player_box[player_box['game_id'].isin(new_game_ids)]
+        player_filtered = player_box[game_id_mask(player_box['game_id'], new_game_ids)]
 
-        # Get team totals for USG% calculation
-        team_totals_for_usg = player_filtered.groupby(['game_id', 'team_id']).agg({
-            'field_goals_attempted': 'sum',
-            'free_throws_attempted': 'sum',
-            'turnovers': 'sum',
-            'minutes': 'sum'
-        }).reset_index()
-        team_totals_for_usg.columns = ['game_id', 'team_id', 'fga', 'fta', 'tov', 'mp']
+        # Get team totals for USG% calculation (team-game keys hashed once)
+        team_game_groups = player_filtered.groupby(['game_id', 'team_id'], sort=False, observed=True)
+        team_totals_for_usg = team_game_groups[
+            ['field_goals_attempted', 'free_throws_attempted', 'turnovers', 'minutes']
+        ].sum()
+        team_totals_for_usg.columns = ['fga', 'fta', 'tov', 'mp']
 
         player_processed = calculate_player_metrics(player_filtered)
 
-        # Calculate USG% with team totals
-        player_processed = player_processed.merge(
-            team_totals_for_usg,
-            on=['game_id', 'team_id'],
-            how='left',
-            suffixes=('', '_team')
-        )
+        # Align team totals to player rows by (game_id, team_id) - no merge needed
+        player_keys = pd.MultiIndex.from_arrays([player_processed['game_id'], player_processed['team_id']])
+        team_totals = team_totals_for_usg.reindex(player_keys)
+        fga_team = team_totals['fga'].to_numpy()
+        fta_team = team_totals['fta'].to_numpy()
+        tov_team = team_totals['tov'].to_numpy()
+        mp_team = team_totals['mp'].to_numpy()
 
+        # Calculate USG% with team totals
         player_processed['usg_pct'] = np.where(
-            (player_processed['mp'] > 0) & (player_processed['fga_team'] + 0.44 * player_processed['fta_team'] + player_processed['tov_team'] > 0),
+            (player_processed['mp'] > 0) & (fga_team + 0.44 * fta_team + tov_team > 0),
             100 * (
                 (player_processed['fga'] + 0.44 * player_processed['fta'] + player_processed['tov']) *
-                (player_processed['mp_team'] / 5)
+                (mp_team / 5)
             ) / (
                 player_processed['mp'] *
-                (player_processed['fga_team'] + 0.44 * player_processed['fta_team'] + player_processed['tov_team'])
+                (fga_team + 0.44 * fta_team + tov_team)
             ),
             0
         )
 
-        # Drop temp team columns
-        player_processed = player_processed.drop(
-            columns=['fga_team', 'fta_team', 'tov_team', 'mp_team'],
-            errors='ignore'
-        )
-
         # Player percentiles (simplified - within sample)
         player_metrics = ['ts_pct', 'usg_pct', 'efg_pct']
-        for metric in player_metrics:
-            if metric in player_processed.columns:
-                player_processed[f'{metric}_pctile'] = player_processed[metric].rank(pct=True) * 100
+        ranked = [m for m in player_metrics if m in player_processed.columns]
+        player_processed[[f'{m}_pctile' for m in ranked]] = (
+            player_processed[ranked].rank(pct=True).to_numpy() * 100
+        )
         player_processed = assign_percentile_labels(player_processed, player_metrics)
     else:
         player_processed = pd.DataFrame()
@@ -853,7 +1032,7 @@ def process_games(start_date=None, force_refresh=False, full_season=False):
     # ===== PBP PROCESSING =====
     print("\n--- Processing play-by-play data ---")
     if not pbp.empty:
-        pbp_filtered = pbp[pbp['game_id'].isin(new_game_ids)]
+        pbp_filtered = pbp[game_id_mask(pbp['game_id'], new_game_ids)]
         shooting_zones = process_pbp_shooting_zones(pbp_filtered, team_processed)
     else:
         shooting_zones = pd.DataFrame()
@@ -861,51 +1040,40 @@ def process_games(start_date=None, force_refresh=False, full_season=False):
     # ===== SAVE OUTPUTS =====
     print("\n--- Saving Tableau-ready datasets ---")
 
-    # Team game summary
-    team_output = PROCESSED_DIR / "game_summary"
-    if team_output.with_suffix('.parquet').exists() and not force_refresh:
-        existing = pd.read_parquet(team_output.with_suffix('.parquet'))
-        team_final = pd.concat([existing, team_processed], ignore_index=True)
-        team_final = team_final.drop_duplicates(subset=['game_id', 'team_id'], keep='last')
-    else:
-        team_final = team_processed
+    apply_dtype_policy(team_processed, rates=TEAM_STORED_RATE_COLUMNS)
 
-    team_final.to_parquet(team_output.with_suffix('.parquet'), index=False)
-    team_final.to_csv(team_output.with_suffix('.csv'), index=False)
-    print(f"  ✓ game_summary: {len(team_final)} rows ({team_final['game_id'].nunique()} games)")
+    # Team game summary
+    team_output = PROCESSED_DIR / "game_summary.parquet"
+    team_rows = upsert_parquet(
+        team_processed, team_output, ['game_id', 'team_id'], overwrite=force_refresh
+    )
+    if emit_csv:
+        write_csv_sidecar(team_output)
+    team_games = pc.count_distinct(pq.read_table(team_output, columns=['game_id'])['game_id']).as_py()
+    print(f"  ✓ game_summary: {team_rows} rows ({team_games} games)")
 
     # Player game
     if not player_processed.empty:
-        player_output = PROCESSED_DIR / "player_game"
-        if player_output.with_suffix('.parquet').exists() and not force_refresh:
-            existing = pd.read_parquet(player_output.with_suffix('.parquet'))
-            player_final = pd.concat([existing, player_processed], ignore_index=True)
-            player_final = player_final.drop_duplicates(subset=['game_id', 'athlete_id'], keep='last')
-        else:
-            player_final = player_processed
-
-        player_final.to_parquet(player_output.with_suffix('.parquet'), index=False)
-        player_final.to_csv(player_output.with_suffix('.csv'), index=False)
-        print(f"  ✓ player_game: {len(player_final)} rows")
+        player_output = PROCESSED_DIR / "player_game.parquet"
+        player_rows = upsert_parquet(
+            player_processed, player_output, ['game_id', 'athlete_id'], overwrite=force_refresh
+        )
+        if emit_csv:
+            write_csv_sidecar(player_output)
+        print(f"  ✓ player_game: {player_rows} rows")
 
     # Shooting zones
     if not shooting_zones.empty:
-        zones_output = PROCESSED_DIR / "shooting_zones"
-        if zones_output.with_suffix('.parquet').exists() and not force_refresh:
-            existing = pd.read_parquet(zones_output.with_suffix('.parquet'))
-            zones_final = pd.concat([existing, shooting_zones], ignore_index=True)
-            zones_final = zones_final.drop_duplicates(
-                subset=['game_id', 'team_id', 'zone_id'], keep='last'
-            )
-        else:
-            zones_final = shooting_zones
-
-        zones_final.to_parquet(zones_output.with_suffix('.parquet'), index=False)
-        zones_final.to_csv(zones_output.with_suffix('.csv'), index=False)
-        print(f"  ✓ shooting_zones: {len(zones_final)} rows")
+        zones_output = PROCESSED_DIR / "shooting_zones.parquet"
+        zones_rows = upsert_parquet(
+            shooting_zones, zones_output, ['game_id', 'team_id', 'zone_id'], overwrite=force_refresh
+        )
+        if emit_csv:
+            write_csv_sidecar(zones_output)
+        print(f"  ✓ shooting_zones: {zones_rows} rows")
 
     # Update tracking
-    all_processed = processed_games.union(new_game_ids)
+    all_processed = np.union1d(processed_games, new_game_ids)
     save_processed_games(all_processed)
     print(f"  Updated tracking: {len(all_processed)} total games")
 
@@ -916,18 +1084,23 @@ def process_games(start_date=None, force_refresh=False, full_season=False):
     print("WEEKLY PULL COMPLETE - Data is Tableau-ready!")
     print("=" * 70)
     print("\nOutput files:")
-    print(f"  • {PROCESSED_DIR}/game_summary.csv")
-    print(f"  • {PROCESSED_DIR}/player_game.csv")
+    outputs = ['game_summary', 'player_game']
     if not shooting_zones.empty:
-        print(f"  • {PROCESSED_DIR}/shooting_zones.csv")
+        outputs.append('shooting_zones')
+    for name in outputs:
+        print(f"  • {PROCESSED_DIR}/{name}.parquet" + (" (+ .csv)" if emit_csv else ""))
 
 
 def log_pull(games_pulled, rows_added):
     """Log pull statistics."""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     log_entry = f"{timestamp} | Games: {games_pulled} | Rows: {rows_added}\n"
-    with open(PULL_LOG_FILE, 'a') as f:
-        f.write(log_entry)
+    # Single O_APPEND write so concurrent pulls never interleave a line
+    fd = os.open(PULL_LOG_FILE, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(fd, log_entry.encode())
+    finally:
+        os.close(fd)
 
 
 # ============================================================================
@@ -954,15 +1127,23 @@ if __name__ == "__main__":
         default='false',
         help='Process entire season (true/false)'
     )
+    parser.add_argument(
+        '--emit-csv',
+        type=str,
+        default='false',
+        help='Also write CSV copies of the outputs for Tableau (true/false)'
+    )
 
     args = parser.parse_args()
 
     start_date = args.start_date if args.start_date else None
     force_refresh = args.force_refresh.lower() == 'true'
     full_season = args.full_season.lower() == 'true'
+    emit_csv = args.emit_csv.lower() == 'true'
 
     process_games(
         start_date=start_date,
         force_refresh=force_refresh,
-        full_season=full_season
+        full_season=full_season,
+        emit_csv=emit_csv
     )
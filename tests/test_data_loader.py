@@ -0,0 +1,49 @@
+"""Tests for the download cache in scripts/data_loader.py."""
+
+import io
+import sys
+import urllib.error
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import data_loader  # noqa: E402
+
+URL = 'https://example.com/releases/team_box_2025.parquet'
+
+
+class _Response(io.BytesIO):
+    headers = {'ETag': '"v1"', 'Last-Modified': None}
+
+
+def _serve(monkeypatch, body=None, error=None):
+    calls = []
+
+    def urlopen(request, timeout=None):
+        calls.append(timeout)
+        if error is not None:
+            raise error
+        return _Response(body)
+
+    monkeypatch.setattr(data_loader.urllib.request, 'urlopen', urlopen)
+    return calls
+
+
+def test_fetch_cached_uses_cached_copy_when_offline(monkeypatch, tmp_path):
+    _serve(monkeypatch, body=b'season data')
+    path = data_loader.fetch_cached(URL, tmp_path)
+
+    calls = _serve(monkeypatch, error=urllib.error.URLError('offline'))
+
+    assert data_loader.fetch_cached(URL, tmp_path) == path
+    assert path.read_bytes() == b'season data'
+    assert calls == [data_loader.FETCH_TIMEOUT]
+
+
+def test_fetch_cached_raises_when_offline_without_cache(monkeypatch, tmp_path):
+    _serve(monkeypatch, error=TimeoutError('timed out'))
+
+    with pytest.raises(TimeoutError):
+        data_loader.fetch_cached(URL, tmp_path)
@@ -0,0 +1,81 @@
+"""Tests for the shared helpers in scripts/metrics.py."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import metrics  # noqa: E402
+
+
+def test_dtype_policy_coerces_counts_and_narrows_rates():
+    df = pd.DataFrame({
+        'assists': ['12', None, 'n/a'],
+        'efg_pct': [0.5, 0.25, np.nan],
+        'team_name': ['a', 'b', 'c'],
+    })
+
+    result = metrics.apply_dtype_policy(df, counts=['assists', 'steals'], rates=['efg_pct', 'ortg'])
+
+    assert result is df
+    assert df['assists'].dtype == metrics.COUNT_DTYPE
+    assert df['assists'].tolist() == [12, 0, 0]
+    assert df['efg_pct'].dtype == metrics.RATE_DTYPE
+    assert 'steals' not in df.columns and 'ortg' not in df.columns
+
+
+# Row 0 is an ordinary game; row 1 has zero FGA, 3PA, turnovers and possessions
+# but free throws, so only ft_pct, ts_pct and the assist fallback are defined
+RATE_INPUTS = {
+    'fgm': [10, 0], 'fga': [20, 0], 'fg3m': [2, 0], 'fg3a': [5, 0], 'ftm': [6, 3],
+    'fta': [8, 4], 'ast': [7, 5], 'tov': [14, 0], 'pts': [28, 3], 'poss_est': [70, 0],
+}
+
+
+def _rate_inputs():
+    return [np.array(RATE_INPUTS[col], dtype=np.float64) for col in metrics.TEAM_RATE_INPUTS]
+
+
+def _expected_rates(fill):
+    return np.array([
+        # fg, fg2, fg3, ft, efg, ts, fg3_rate, ftr, tov, ast_pct, ast_tov, ortg
+        [0.5, 8 / 15, 0.4, 0.75, 0.55, 28 / 47.04, 0.25, 0.4, 0.2, 0.7, 0.5, 40.0],
+        [fill, fill, fill, 0.75, fill, 3 / 3.52, fill, fill, fill, fill, 5.0, fill],
+    ])
+
+
+@pytest.mark.parametrize('fill', [0.0, np.nan])
+def test_team_rates_fill_zero_denominators(fill):
+    rates = metrics.team_rates(*_rate_inputs(), fill=fill)
+
+    assert rates.dtype == np.float64
+    np.testing.assert_allclose(rates, _expected_rates(fill), rtol=1e-12)
+
+
+def test_add_team_rates_writes_requested_columns():
+    df = pd.DataFrame(RATE_INPUTS)
+
+    result = metrics.add_team_rates(df, ['ts_pct', 'ast_tov'], fill=np.nan)
+
+    assert result is df
+    assert 'efg_pct' not in df.columns
+    np.testing.assert_allclose(df['ts_pct'], [28 / 47.04, 3 / 3.52])
+    np.testing.assert_allclose(df['ast_tov'], [0.5, 5.0])
+
+
+@pytest.mark.parametrize('fill', [0.0, np.nan])
+def test_team_rates_numba_matches_numpy(monkeypatch, fill):
+    pytest.importorskip('numba')
+    assert metrics.HAS_NUMBA
+    rng = np.random.default_rng(0)
+    inputs = [rng.integers(0, 30, 500).astype(np.float64) for _ in metrics.TEAM_RATE_INPUTS]
+    for col in inputs:
+        col[rng.random(500) < 0.1] = 0
+
+    compiled = metrics.team_rates(*inputs, fill=fill)
+    monkeypatch.setattr(metrics, 'HAS_NUMBA', False)
+    np.testing.assert_array_equal(compiled, metrics.team_rates(*inputs, fill=fill))
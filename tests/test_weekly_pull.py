@@ -0,0 +1,104 @@
+"""Regression tests for scripts/weekly_pull.py output helpers."""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import weekly_pull  # noqa: E402
+
+
+def test_csv_sidecar_keeps_tableau_text_format(tmp_path):
+    df = pd.DataFrame({
+        'game_id': np.array([401, 402], dtype='int64'),
+        'game_date': [date(2025, 11, 21), date(2025, 11, 22)],
+        'game_date_time': pd.to_datetime(['2025-11-21 23:30', '2025-11-22 19:00']).tz_localize('America/New_York'),
+        'team_name': ['Bruins', 'Huskies, UConn'],
+        'win': [False, True],
+        'opp_pts': [77.0, 80.0],
+        'efg_pct': np.array([0.5, 0.4230769], dtype='float32'),
+    })
+    parquet_path = tmp_path / 'game_summary.parquet'
+    df.to_parquet(parquet_path, index=False)
+
+    weekly_pull.write_csv_sidecar(parquet_path)
+
+    lines = parquet_path.with_suffix('.csv').read_text().splitlines()
+    assert lines[0] == 'game_id,game_date,game_date_time,team_name,win,opp_pts,efg_pct'
+    assert lines[1] == '401,2025-11-21,2025-11-21 23:30:00-05:00,Bruins,False,77.0,0.5'
+    assert lines[2] == '402,2025-11-22,2025-11-22 19:00:00-05:00,"Huskies, UConn",True,80.0,0.4230769'
+
+
+def _shot_pbp(team_ids):
+    return pd.DataFrame({
+        'game_id': [401, 401, 401],
+        'team_id': team_ids,
+        'text': ['Smith made Layup.', 'Jones missed Three Point Jumper.', 'Lee made Jumper.'],
+        'type_text': ['LayUpShot', 'JumpShot', 'JumpShot'],
+        'scoring_play': [True, False, True],
+    })
+
+
+def test_shooting_zones_without_team_ids_returns_empty_frame():
+    zones = weekly_pull.process_pbp_shooting_zones(_shot_pbp([np.nan] * 3), pd.DataFrame())
+
+    assert zones.empty
+    assert 'fga_pct' in zones.columns
+
+
+def test_shooting_zone_fga_share_sums_to_one_per_team():
+    zones = weekly_pull.process_pbp_shooting_zones(_shot_pbp([7, 7, 9]), pd.DataFrame())
+
+    shares = zones.groupby('team_id')['fga_pct'].sum()
+    np.testing.assert_allclose(shares.to_numpy(), [1.0, 1.0])
+
+
+def test_upsert_replaces_rows_when_stored_game_ids_are_strings(tmp_path):
+    path = tmp_path / 'game_summary.parquet'
+    pd.DataFrame({'game_id': ['401', '402'], 'team_id': [7, 7], 'pts': [60, 70]}).to_parquet(path, index=False)
+
+    rows = weekly_pull.upsert_parquet(
+        pd.DataFrame({'game_id': [402], 'team_id': [7], 'pts': [71]}), path, ['game_id', 'team_id']
+    )
+
+    result = pd.read_parquet(path)
+    assert rows == 2
+    assert result['game_id'].tolist() == ['401', '402']
+    assert result['pts'].tolist() == [60, 71]
+
+
+def test_upsert_rewrites_when_new_rows_cannot_cast_to_stored_types(tmp_path):
+    path = tmp_path / 'game_summary.parquet'
+    pd.DataFrame({'game_id': [401, 402], 'team_id': [7, 7], 'logo': [None, None]}).to_parquet(path, index=False)
+
+    rows = weekly_pull.upsert_parquet(
+        pd.DataFrame({'game_id': [403], 'team_id': [7], 'logo': ['x']}), path, ['game_id', 'team_id']
+    )
+
+    result = pd.read_parquet(path)
+    assert rows == 3
+    assert result['game_id'].tolist() == [401, 402, 403]
+    assert result['logo'].isna().tolist() == [True, True, False]
+    assert result['logo'].iloc[2] == 'x'
+
+
+def test_upsert_replaces_rows_across_streamed_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(weekly_pull, 'PARQUET_ROW_GROUP_SIZE', 3)
+    path = tmp_path / 'game_summary.parquet'
+    history = pd.DataFrame({'game_id': np.arange(401, 409), 'team_id': 7, 'pts': np.arange(60, 68)})
+    history.to_parquet(path, index=False, row_group_size=3)
+
+    # 402 sits in the first batch, 407 in the third
+    rows = weekly_pull.upsert_parquet(
+        pd.DataFrame({'game_id': [402, 407], 'team_id': [7, 7], 'pts': [99, 98]}), path, ['game_id', 'team_id']
+    )
+
+    result = pd.read_parquet(path)
+    assert rows == 8
+    assert len(result) == 8
+    assert result['game_id'].tolist() == [401, 403, 404, 405, 406, 408, 402, 407]
+    assert result['pts'].tolist() == [60, 62, 63, 64, 65, 67, 99, 98]